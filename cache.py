@@ -0,0 +1,48 @@
+"""
+Redis-backed response cache for the GeminiSpeak backend.
+
+Caching is optional: when REDIS_URL is not set every lookup is a miss and
+writes are skipped, so the backend keeps working without a Redis instance.
+Redis errors are logged and treated the same way rather than failing a chat.
+"""
+import os
+import logging
+from typing import Optional
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[redis.Redis] = None
+
+def _get_client() -> Optional[redis.Redis]:
+    # Created lazily so REDIS_URL is read after the app has loaded its .env file
+    global _client
+    if _client is None:
+        redis_url = os.getenv("REDIS_URL")
+        if not redis_url:
+            return None
+        _client = redis.Redis.from_url(redis_url, decode_responses=True)
+        logger.info("Redis response cache enabled.")
+    return _client
+
+async def get(key: str) -> Optional[str]:
+    """Returns the cached value for `key`, or None on a miss."""
+    client = _get_client()
+    if client is None:
+        return None
+    try:
+        return await client.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Cache GET failed for '{key}': {e}")
+        return None
+
+async def set(key: str, value: str, ttl: int) -> None:
+    """Stores `value` under `key` for `ttl` seconds."""
+    client = _get_client()
+    if client is None:
+        return
+    try:
+        await client.setex(key, ttl, value)
+    except redis.RedisError as e:
+        logger.warning(f"Cache SET failed for '{key}': {e}")
@@ -1,15 +1,29 @@
-# uvicorn fastapi_app2:app --reload --port 8001
+# Development: uvicorn chatbot:app --reload --timeout-keep-alive 75 --port 8001
+# Production:  uvicorn chatbot:app --workers $(nproc) --loop uvloop --http httptools --no-access-log --timeout-keep-alive 75 --port 8001
+#              (or simply `python chatbot.py`)
  
 import os
+import json
+import time
+import asyncio
+import hashlib
+import datetime
+import orjson
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, status # Import status for better clarity
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field # Import Field for better validation
-from typing import List, Dict, Optional # Import Optional for optional fields
+from typing import List, Dict, Literal, Optional # Import Optional for optional fields
+from typing_extensions import Annotated, TypedDict # Pydantic needs typing_extensions' TypedDict before Python 3.12
  
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 import logging # Import logging
  
+import cache # Redis-backed response cache (no-op when REDIS_URL is unset)
+ 
 # --- Logging Configuration (New) ---
 logging.basicConfig(level=logging.INFO) # Set logging level to INFO
 logger = logging.getLogger(__name__) # Get a logger for this module
@@ -23,23 +37,141 @@ if not GEMINI_API_KEY:
     logger.error("GEMINI_API_KEY not found in environment variables. Please set it in your .env file.")
     raise ValueError("GEMINI_API_KEY not found in environment variables. Please set it in your .env file.")
  
+MODEL_NAME = "gemini-2.0-flash"
+# Only the most recent turns (one user + one model message each) are sent to Gemini,
+# so prompt size and time-to-first-token stop growing with the session length
+# (0 sends no history; negative values are treated as 0)
+MAX_HISTORY_TURNS = max(int(os.getenv("MAX_HISTORY_TURNS", "20")), 0)
+# Hard limits on incoming payloads, enforced by Pydantic before the handler runs
+MAX_HISTORY_MESSAGES = 200
+MAX_PART_LENGTH = 32000 # Long enough for a full-length Gemini reply being sent back as history
+MAX_PARTS_PER_MESSAGE = 8 # The Streamlit client sends one text part per message
+# Optional system prompt shared by every conversation
+SYSTEM_PROMPT = os.getenv("SYSTEM_PROMPT")
+# Optional sampling temperature; when unset Gemini's default (non-deterministic) sampling is used
+GEMINI_TEMPERATURE = os.getenv("GEMINI_TEMPERATURE")
+GENERATION_CONFIG = {"temperature": float(GEMINI_TEMPERATURE)} if GEMINI_TEMPERATURE else None
+ 
+# --- Response Cache Configuration ---
+# Bump CACHE_VERSION to bulk-invalidate cached replies and the Gemini context cache
+# (e.g. after a model swap or prompt template edit)
+CACHE_VERSION = "v1"
+# Replies are only repeatable at temperature 0, so only those are kept for days; sampled
+# replies are kept just long enough to absorb retries and double submits
+IS_DETERMINISTIC = GENERATION_CONFIG is not None and GENERATION_CONFIG["temperature"] == 0
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60 if IS_DETERMINISTIC else 5 * 60 # 7 days / 5 minutes
+MODELS_CACHE_TTL_SECONDS = 10 * 60 # The model catalog rarely changes
+CONTEXT_CACHE_TTL = datetime.timedelta(hours=1)
+CONTEXT_CACHE_REFRESH_SECONDS = 50 * 60 # Extend the context cache before its TTL lapses
+CONTEXT_CACHE_RETRY_SECONDS = 60 # Retry delay after the context cache could not be recreated
+# Keep idle client connections open longer than uvicorn's 5s default, so the Streamlit
+# frontend's pooled connection survives between chat turns
+KEEP_ALIVE_SECONDS = 75
+INFLIGHT_WAIT_SECONDS = 30 # Max wait for the next token; below the Streamlit client's 60s timeout
+ 
 # Configure the Gemini API
 genai.configure(api_key=GEMINI_API_KEY)
  
+def create_model():
+    """Returns a model that sends the system prompt with each request (no context cache)."""
+    return genai.GenerativeModel(MODEL_NAME, system_instruction=SYSTEM_PROMPT, generation_config=GENERATION_CONFIG)
+ 
 # Initialize the Gemini model
 model = None # Initialize as None
 try:
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    logger.info("Gemini model 'gemini-2.0-flash' initialized successfully.")
+    model = create_model()
+    logger.info(f"Gemini model '{MODEL_NAME}' initialized successfully.")
 except Exception as e:
-    logger.error(f"Error initializing Gemini model 'gemini-2.0-flash': {e}")
+    logger.error(f"Error initializing Gemini model '{MODEL_NAME}': {e}")
     # In a production app, you might want to gracefully degrade or indicate service unavailability
     # For now, it will raise an error if model is called when None
  
+# --- Gemini Context Caching ---
+# The system prompt is stored server-side once and reused by every chat, so Gemini
+# doesn't re-process (or bill at the full rate) the shared prefix on each turn
+# All uvicorn workers share one cache, found by a display name derived from the model
+# and prompt, so N workers don't each create (and pay storage for) their own copy
+context_cache = None
+CONTEXT_CACHE_NAME = "geminispeak-system-{}-{}".format(
+    CACHE_VERSION,
+    hashlib.sha256(f"{MODEL_NAME}\n{SYSTEM_PROMPT}".encode("utf-8")).hexdigest()[:16]
+)
+ 
+def find_context_caches() -> List:
+    """Returns the existing context caches for CONTEXT_CACHE_NAME, oldest first."""
+    matches = [c for c in genai.caching.CachedContent.list() if c.display_name == CONTEXT_CACHE_NAME]
+    return sorted(matches, key=lambda c: c.create_time)
+ 
+def create_context_cache():
+    """Returns the shared cached system prompt (creating it if needed) with a model bound to it."""
+    existing = find_context_caches()
+    if existing:
+        cached_content = existing[0]
+        # A cache left by an earlier deployment may be close to expiring; reset its TTL
+        # so it outlives the first CONTEXT_CACHE_REFRESH_SECONDS wait
+        cached_content.update(ttl=CONTEXT_CACHE_TTL)
+    else:
+        cached_content = genai.caching.CachedContent.create(
+            model=f"models/{MODEL_NAME}",
+            display_name=CONTEXT_CACHE_NAME,
+            system_instruction=SYSTEM_PROMPT,
+            ttl=CONTEXT_CACHE_TTL
+        )
+        # Workers starting at the same moment may all create one; keep only the oldest
+        oldest = find_context_caches()[0]
+        if oldest.name != cached_content.name:
+            cached_content.delete()
+            cached_content = oldest
+    return cached_content, genai.GenerativeModel.from_cached_content(cached_content, generation_config=GENERATION_CONFIG)
+ 
+async def refresh_context_cache():
+    """Keeps the context cache alive, recreating it if it has expired or been deleted."""
+    global context_cache, model
+    delay = CONTEXT_CACHE_REFRESH_SECONDS
+    while True:
+        await asyncio.sleep(delay)
+        if context_cache:
+            try:
+                await asyncio.to_thread(context_cache.update, ttl=CONTEXT_CACHE_TTL)
+                delay = CONTEXT_CACHE_REFRESH_SECONDS
+                continue
+            except Exception as e:
+                logger.warning(f"Could not extend Gemini context cache, recreating it: {e}")
+        try:
+            context_cache, model = await asyncio.to_thread(create_context_cache)
+            delay = CONTEXT_CACHE_REFRESH_SECONDS
+            logger.info(f"Gemini context cache '{context_cache.name}' recreated.")
+        except Exception as e:
+            # Don't leave chats bound to a dead cache; send the prompt inline until a retry succeeds
+            logger.error(f"Error recreating Gemini context cache, retrying in {CONTEXT_CACHE_RETRY_SECONDS}s: {e}")
+            context_cache, model = None, create_model()
+            delay = CONTEXT_CACHE_RETRY_SECONDS
+ 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global context_cache, model
+    refresh_task = None
+    if SYSTEM_PROMPT and model:
+        try:
+            context_cache, model = await asyncio.to_thread(create_context_cache)
+            refresh_task = asyncio.create_task(refresh_context_cache())
+            logger.info(f"Gemini context cache '{context_cache.name}' created.")
+        except Exception as e:
+            # e.g. the prompt is below Gemini's minimum cacheable size
+            logger.warning(f"Gemini context caching unavailable, sending the system prompt with each request: {e}")
+ 
+    yield
+ 
+    if refresh_task:
+        refresh_task.cancel()
+    # The context cache is shared with other workers, so it is left to expire after its TTL
+ 
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title="GeminiSpeak Backend",
-    description="FastAPI backend for Real-Time Gemini Chat Assistant"
+    description="FastAPI backend for Real-Time Gemini Chat Assistant",
+    default_response_class=ORJSONResponse, # orjson serializes responses several times faster than json
+    lifespan=lifespan
 )
  
 # --- CORS Middleware ---
@@ -54,26 +186,204 @@ app.add_middleware(
  
 # --- Pydantic Models for Request/Response ---
 # Enhanced Pydantic models for better validation and clarity
-class ChatPart(BaseModel):
-    text: str = Field(..., description="The text content of a message part.")
+# History entries are TypedDicts: Pydantic still validates their shape and limits, but
+# produces plain dicts that can be handed to start_chat without building model objects
+class ChatPart(TypedDict):
+    text: Annotated[str, Field(max_length=MAX_PART_LENGTH, description="The text content of a message part.")]
  
-class ChatMessage(BaseModel):
-    role: str = Field(..., description="The role of the message sender (e.g., 'user', 'model').")
-    parts: List[ChatPart] = Field(..., description="A list of content parts, typically text.")
+class ChatMessage(TypedDict):
+    role: Annotated[Literal["user", "model"], Field(description="The role of the message sender ('user' or 'model').")]
+    parts: Annotated[List[ChatPart], Field(max_length=MAX_PARTS_PER_MESSAGE, description="A list of content parts, typically text.")]
  
 class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=1000, description="The user's new message.")
-    chat_history: List[ChatMessage] = Field(..., description="The full conversation history for context.")
+    chat_history: List[ChatMessage] = Field(..., max_length=MAX_HISTORY_MESSAGES, description="The full conversation history for context.")
+ 
+# --- Streaming Helpers ---
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no", # Stop reverse proxies (e.g. nginx) from buffering the stream
+}
+ 
+# Fixed parts of every SSE frame, concatenated as bytes so each frame skips f-string
+# formatting and the decode/re-encode round-trip
+SSE_PREFIX = b"data: "
+SSE_SUFFIX = b"\n\n"
  
-class ChatResponse(BaseModel):
-    ai_message: str = Field(..., description="The AI's generated response.")
+def sse_event(payload: Dict) -> bytes:
+    """Formats a payload as a single Server-Sent Events frame."""
+    return SSE_PREFIX + orjson.dumps(payload) + SSE_SUFFIX
+ 
+# With stream=True the SDK doesn't check finish reasons, so relay_gemini_stream does it instead:
+# anything other than these (SAFETY, RECITATION, ...) means Gemini cut the reply short
+FinishReason = genai.protos.Candidate.FinishReason
+CLEAN_FINISH_REASONS = (FinishReason.FINISH_REASON_UNSPECIFIED, FinishReason.STOP, FinishReason.MAX_TOKENS)
+ 
+def chunk_text(chunk) -> str:
+    """
+    Returns a streamed chunk's text via the SDK's `.text` accessor, or "" for chunks
+    without text parts, which `.text` rejects. Their finish reason is checked separately.
+    """
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+ 
+# --- Request Coalescing ---
+# Concurrent identical requests (same cache key) share a single upstream Gemini call.
+# A background task reads Gemini's stream into an InflightReply, and every request for
+# that key (the one that started it included) follows the reply token by token
+class InflightReply:
+    """A Gemini reply that is still being streamed, shared by coalesced requests."""
+ 
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.error: Optional[str] = None # Set if the reply failed or was cut short
+        self.finished = False
+        self.task: Optional[asyncio.Task] = None # Holds a reference to the background task
+        self._condition = asyncio.Condition()
+ 
+    async def publish(self, token: str):
+        async with self._condition:
+            self.tokens.append(token)
+            self._condition.notify_all()
+ 
+    async def finish(self, error: Optional[str] = None):
+        async with self._condition:
+            self.error = error
+            self.finished = True
+            self._condition.notify_all()
+ 
+    async def follow(self):
+        """
+        Yields every token published so far, then new ones as they arrive, until the
+        reply finishes. Raises asyncio.TimeoutError if no progress is made for
+        INFLIGHT_WAIT_SECONDS.
+        """
+        index = 0
+        while True:
+            async with self._condition:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: index < len(self.tokens) or self.finished),
+                    timeout=INFLIGHT_WAIT_SECONDS
+                )
+                new_tokens = self.tokens[index:]
+                finished = self.finished
+            for token in new_tokens:
+                yield token
+            index += len(new_tokens)
+            if finished:
+                return
+ 
+inflight_replies: Dict[str, InflightReply] = {}
+ 
+def unregister_inflight(cache_key: str, inflight: InflightReply):
+    if inflight_replies.get(cache_key) is inflight:
+        del inflight_replies[cache_key]
+ 
+async def relay_gemini_stream(response, message: str, cache_key: str, inflight: InflightReply):
+    """
+    Reads Gemini's streamed chunks into `inflight`. Runs as its own task, so the reply
+    is always finished and unregistered even if no client ever reads the stream.
+    The complete reply is stored under `cache_key` if Gemini finished with STOP.
+    """
+    ai_text = ""
+    error = None
+    is_fallback = False # True when ai_text is our placeholder rather than Gemini's reply
+    finish_reason = FinishReason.FINISH_REASON_UNSPECIFIED
+    try:
+        async for chunk in response:
+            token = chunk_text(chunk)
+            if token:
+                ai_text += token
+                await inflight.publish(token)
+            if chunk.candidates:
+                finish_reason = chunk.candidates[0].finish_reason
+                if finish_reason not in CLEAN_FINISH_REASONS:
+                    break
+        if finish_reason not in CLEAN_FINISH_REASONS:
+            reason = FinishReason(finish_reason).name
+            logger.warning(f"Gemini stopped early ({reason}) for message: '{message}'")
+            error = f"Gemini stopped the response early (finish reason: {reason})."
+        elif not ai_text:
+            ai_text = "Sorry, I couldn't generate a coherent response."
+            is_fallback = True
+            logger.warning(f"Gemini returned an empty or malformed response for message: '{message}'")
+            await inflight.publish(ai_text)
+        else:
+            logger.info(f"Gemini responded: '{ai_text[:50]}...'") # Log first 50 chars
+    except Exception as e:
+        logger.error(f"Error while streaming Gemini response: {e}", exc_info=True)
+        error = f"Gemini stream interrupted: {e}"
+    finally:
+        # Also runs on cancellation, so followers are never left waiting
+        await inflight.finish(error)
+ 
+    try:
+        if error is None and not is_fallback and finish_reason == FinishReason.STOP:
+            # MAX_TOKENS replies are truncated, so only naturally finished, real ones are cached
+            await cache.set(cache_key, ai_text, CACHE_TTL_SECONDS)
+    finally:
+        unregister_inflight(cache_key, inflight)
+ 
+async def token_stream(inflight: InflightReply):
+    """
+    Relays a (possibly shared) Gemini reply to the client as SSE frames
+    (`{"token": ...}`), finishing with a `{"done": true}` frame.
+    """
+    try:
+        async for token in inflight.follow():
+            yield sse_event({"token": token})
+    except asyncio.TimeoutError:
+        # Headers are already sent, so errors can only be reported in-band
+        yield sse_event({"error": "Timed out waiting for Gemini to respond."})
+        return
+    if inflight.error:
+        yield sse_event({"error": inflight.error})
+        return
+    yield sse_event({"done": True})
+ 
+async def cached_stream(ai_text: str):
+    """Replays a cached reply as a single token frame followed by `done`."""
+    yield sse_event({"token": ai_text})
+    yield sse_event({"done": True})
+ 
+def build_cache_key(formatted_history: List[Dict], message: str) -> str:
+    """Derives a versioned cache key from the model, its settings, the history and new message."""
+    raw = json.dumps([MODEL_NAME, SYSTEM_PROMPT, GENERATION_CONFIG, formatted_history, message], sort_keys=True)
+    return f"gemini:{CACHE_VERSION}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+ 
+async def send_to_gemini(formatted_history: List[Dict], message: str):
+    """
+    Starts a streamed Gemini reply for `message`. If the shared context cache turns out
+    to have expired or been deleted, switches to the uncached model and retries once,
+    rather than failing every chat until the refresh loop notices.
+    """
+    global context_cache, model
+    current_model, uses_context_cache = model, context_cache is not None
+    try:
+        # Initialize chat with existing history
+        convo = current_model.start_chat(history=formatted_history)
+ 
+        # Send the new message to the conversation
+        # stream=True returns as soon as the first chunk is ready, so errors raised
+        # before generation starts still surface as regular HTTP errors in the endpoint
+        return await convo.send_message_async(message, stream=True)
+    except (google_exceptions.NotFound, google_exceptions.PermissionDenied) as e:
+        # Gemini reports a missing cached content as 404 or 403
+        if not uses_context_cache:
+            raise
+        logger.warning(f"Gemini context cache unavailable, sending the system prompt inline until it is recreated: {e}")
+        if model is current_model:
+            context_cache, model = None, create_model()
+        return await model.start_chat(history=formatted_history).send_message_async(message, stream=True)
  
 # --- API Endpoints ---
-@app.post("/chat", response_model=ChatResponse)
+@app.post("/chat")
 async def chat_with_gemini(request: ChatRequest):
     """
     Receives a user message and chat history, sends it to Gemini,
-    and returns the AI's response.
+    and streams the AI's response back as Server-Sent Events.
     """
     if not model:
         logger.error("Attempted to call chat endpoint but Gemini model was not initialized.")
@@ -91,38 +401,52 @@ async def chat_with_gemini(request: ChatRequest):
         )
  
     try:
-        # Prepare the chat history in the format Gemini expects (list of dicts)
-        # Ensure 'parts' contains dicts with 'text' key
-        formatted_history = []
-        for msg in request.chat_history:
-            # Re-format parts to be list of dictionaries for the Gemini API call if needed
-            # The google-generativeai library's start_chat method can usually handle
-            # {"role": "user", "parts": ["text content"]} directly if the SDK is recent.
-            # However, being explicit with {"text": "..."} in parts is safer.
-            formatted_parts = [{"text": part.text} for part in msg.parts]
-            formatted_history.append({"role": msg.role, "parts": formatted_parts})
- 
+        # The validated history is already in the format Gemini expects
+        # ({"role": ..., "parts": [{"text": ...}]}), so it is passed through as is
+        formatted_history = request.chat_history
+        if len(formatted_history) > MAX_HISTORY_TURNS * 2:
+            # Positive start index, since a [-0:] slice would keep the whole list
+            formatted_history = formatted_history[len(formatted_history) - MAX_HISTORY_TURNS * 2:]
+            # Keep the window starting on a user turn
+            while formatted_history and formatted_history[0]["role"] != "user":
+                formatted_history.pop(0)
+            logger.info(f"Chat history truncated to the last {len(formatted_history)} messages.")
  
         logger.info(f"Received message: '{request.message}' with history length: {len(formatted_history)}")
         # logger.debug(f"Formatted history for Gemini: {formatted_history}") # Uncomment for deeper debugging
  
-        # Initialize chat with existing history
-        convo = model.start_chat(history=formatted_history)
- 
-        # Send the new message to the conversation
-        # Using send_message_async for non-blocking I/O with FastAPI
-        response = await convo.send_message_async(request.message)
+        # Serve identical prompts (retries, repeated FAQs) without calling Gemini again
+        cache_key = build_cache_key(formatted_history, request.message)
+        cached_reply = await cache.get(cache_key)
+        if cached_reply is not None:
+            logger.info(f"Cache hit for message: '{request.message}'")
+            return StreamingResponse(
+                cached_stream(cached_reply),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS
+            )
  
-        # Access the text from the response
-        # Robustly check if content and parts exist
-        if response.candidates and response.candidates[0].content and response.candidates[0].content.parts:
-            ai_text = response.candidates[0].content.parts[0].text
+        # Join an identical request that is already streaming from Gemini
+        inflight = inflight_replies.get(cache_key)
+        if inflight is not None:
+            logger.info(f"Coalesced with in-flight request for message: '{request.message}'")
         else:
-            ai_text = "Sorry, I couldn't generate a coherent response."
-            logger.warning(f"Gemini returned an empty or malformed response for message: '{request.message}'")
+            # Registered before the first await so identical requests arriving meanwhile join it
+            inflight = InflightReply()
+            inflight_replies[cache_key] = inflight
+            try:
+                response = await send_to_gemini(formatted_history, request.message)
+            except Exception as e:
+                await inflight.finish(f"Gemini request failed: {e}")
+                unregister_inflight(cache_key, inflight)
+                raise
+            inflight.task = asyncio.create_task(relay_gemini_stream(response, request.message, cache_key, inflight))
  
-        logger.info(f"Gemini responded: '{ai_text[:50]}...'") # Log first 50 chars
-        return ChatResponse(ai_message=ai_text)
+        return StreamingResponse(
+            token_stream(inflight),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
  
     except genai.types.BlockedPromptException as e:
         logger.warning(f"Prompt blocked by safety settings: {e}")
@@ -148,27 +472,56 @@ async def root():
     return {"message": "Welcome to GeminiSpeak Backend! Visit /docs for API documentation."}
  
 # Optional: Endpoint to list models (useful for debugging, can be removed in production)
+_models_cache = {"loaded_at": 0.0, "models": None}
+_models_cache_lock = asyncio.Lock()
+ 
+def _load_models() -> List[Dict]:
+    """Fetches the Gemini models that support content generation."""
+    available_models = []
+    for m in genai.list_models():
+        if "generateContent" in m.supported_generation_methods:
+            available_models.append({
+                "name": m.name,
+                "displayName": m.display_name,
+                "supported_methods": list(m.supported_generation_methods)
+            })
+    logger.info(f"Successfully listed {len(available_models)} models.")
+    return available_models
+ 
 @app.get("/list_models")
 async def list_available_models():
     """
     Lists all Gemini models available with the configured API key
     and their supported generation methods.
+    Results are cached in-process for MODELS_CACHE_TTL_SECONDS.
     """
     if not GEMINI_API_KEY:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="GEMINI_API_KEY not set.")
  
     try:
-        available_models = []
-        for m in genai.list_models():
-            if "generateContent" in m.supported_generation_methods:
-                available_models.append({
-                    "name": m.name,
-                    "displayName": m.display_name,
-                    "supported_methods": list(m.supported_generation_methods)
-                })
-        logger.info(f"Successfully listed {len(available_models)} models.")
-        return {"models": available_models}
+        # The lock makes concurrent callers wait for a single refresh instead of each fetching
+        async with _models_cache_lock:
+            if _models_cache["models"] is None or time.monotonic() - _models_cache["loaded_at"] > MODELS_CACHE_TTL_SECONDS:
+                # genai.list_models() is a blocking iterator, so keep it off the event loop
+                _models_cache["models"] = await asyncio.to_thread(_load_models)
+                _models_cache["loaded_at"] = time.monotonic()
+        return {"models": _models_cache["models"]}
     except Exception as e:
         logger.error(f"Error listing models: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error listing models: {e}")
- 
\ No newline at end of file
+ 
+if __name__ == "__main__":
+    import uvicorn
+ 
+    # One worker per CPU by default; each worker keeps its own in-process caches,
+    # while the Redis and Gemini context caches are shared
+    uvicorn.run(
+        "chatbot:app",
+        host="127.0.0.1",
+        port=8001,
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS
+    )
@@ -1,52 +1,57 @@
 import streamlit as st
-import requests
+import httpx
 import json
+import threading
+from pathlib import Path
 
 st.set_page_config(page_title="GeminiSpeak", page_icon="💬", layout="centered")  # Only once, at the top
 
 # --- Custom CSS for Stylish Design ---
-st.markdown("""
-    <style>
-    .stChatMessage {
-        border-radius: 16px;
-        padding: 12px 18px;
-        margin-bottom: 10px;
-        font-size: 1.1rem;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.04);
-    }
-    .stChatMessage.user {
-        background: linear-gradient(90deg, #e0e7ff 0%, #f3f4f6 100%);
-        color: #22223b;
-        align-self: flex-end;
-    }
-    .stChatMessage.assistant {
-        background: linear-gradient(90deg, #f9fafb 0%, #e0f2fe 100%);
-        color: #1e293b;
-        align-self: flex-start;
-    }
-    .stButton>button {
-        background: #6366f1;
-        color: white;
-        border-radius: 8px;
-        font-weight: 600;
-        border: none;
-        padding: 0.5em 1.2em;
-        margin-top: 10px;
-    }
-    .stButton>button:hover {
-        background: #4338ca;
-        color: #fff;
-    }
-    .block-container {
-        padding-top: 2rem;
-        padding-bottom: 2rem;
-    }
-    </style>
-""", unsafe_allow_html=True)
+# Kept in static/style.css and read once per server process instead of on every rerun
+CSS_PATH = Path(__file__).parent / "static" / "style.css"
+
+@st.cache_data
+def load_css():
+    return f"<style>{CSS_PATH.read_text()}</style>"
+
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # --- Configuration ---
 FASTAPI_URL = "http://localhost:8001"
 CHAT_ENDPOINT = f"{FASTAPI_URL}/chat"
+# Messages of history sent per turn: the backend's default MAX_HISTORY_TURNS (20) * 2, since
+# it drops anything older anyway. Keep in sync with it, and under its 200-message limit
+HISTORY_WINDOW_MESSAGES = 40
+MAX_PART_LENGTH = 32000 # Backend's per-part limit; longer history text is clipped to fit
+VISIBLE_MESSAGES = 30 # Messages always rendered; older ones only while "Show earlier messages" is on
+# Idle pooled connections are kept this long; below the backend's 75s keep-alive timeout
+# so the client, not the server, closes them
+KEEPALIVE_EXPIRY_SECONDS = 60
+
+# Reuse one pooled HTTP client per browser session so every turn goes over the same
+# keep-alive connection instead of paying a fresh TCP (+TLS) handshake.
+# HTTP/2 is negotiated over TLS, letting concurrent requests share one connection
+if "http" not in st.session_state:
+    http = httpx.Client(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=32,
+            max_keepalive_connections=16,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
+        )
+    )
+    st.session_state.http = http
+
+    # Open the pooled connection in the background when the session starts; it stays
+    # open for up to KEEPALIVE_EXPIRY_SECONDS, so a first message sent within that
+    # window skips connection setup
+    def warm_up_connection(client):
+        try:
+            client.get(FASTAPI_URL, timeout=5)
+        except httpx.HTTPError:
+            pass # Best effort; real errors surface on the first chat request
+
+    threading.Thread(target=warm_up_connection, args=(http,), daemon=True).start()
 
 # --- Streamlit UI Setup ---
 st.markdown("<h1 style='text-align:center; color:#6366f1;'>👨 Mithun Kichu's AI Assistant</h1>", unsafe_allow_html=True)
@@ -57,15 +62,18 @@ with st.sidebar:
     st.markdown("<h2 style='color:#6366f1;'>Options</h2>", unsafe_allow_html=True)
     if st.button("🧹 Clear Chat"):
         st.session_state.messages = []
+        st.session_state.api_history = []
         st.rerun()
 
 # Initialize chat history in Streamlit's session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
+# Gemini-formatted copy of the conversation, appended alongside `messages`
+# so each turn doesn't have to rebuild it from scratch
+st.session_state.setdefault("api_history", [])
 
 # --- Display Chat Messages with Avatars and Styling ---
-# Iterate through messages and display them with appropriate avatars
-for message in st.session_state.messages:
+def render_message(message):
     avatar = "🧑‍💻" if message["role"] == "user" else "🤖"
     with st.chat_message(message["role"]):
         st.markdown(
@@ -75,15 +83,28 @@ for message in st.session_state.messages:
             unsafe_allow_html=True
         )
 
+# Only the latest messages are rendered by default. Older ones are rendered only while
+# the toggle is on, so a long chat doesn't grow the work done on every rerun
+# (an st.expander would still build and send every hidden message)
+hidden_count = max(len(st.session_state.messages) - VISIBLE_MESSAGES, 0)
+if hidden_count:
+    # Fixed parameters and key, so the toggle keeps its state as the chat grows
+    st.caption(f"{hidden_count} earlier messages hidden")
+    if st.toggle("Show earlier messages", key="show_earlier_messages"):
+        for message in st.session_state.messages[:hidden_count]:
+            render_message(message)
+for message in st.session_state.messages[hidden_count:]:
+    render_message(message)
+
 
 # --- Chat Input with UI Feedback ---
 # We'll use a placeholder for the chat input text
-prompt = st.chat_input("Say something...", disabled=st.session_state.get("thinking", False))
-# `disabled` state will be managed when AI is responding.
+prompt = st.chat_input("Say something...")
 
 if prompt:
     # 1. Add user message to chat history and display immediately
     st.session_state.messages.append({"role": "user", "content": prompt})
+    st.session_state.api_history.append({"role": "user", "parts": [{"text": prompt[:MAX_PART_LENGTH]}]})
     with st.chat_message("user"):
         st.markdown(
             f"<div class='stChatMessage user'>🧑‍💻 &nbsp; {prompt}</div>",
@@ -91,43 +112,58 @@ if prompt:
         )
 
     # 2. Prepare chat history for FastAPI
-    chat_history_for_api = []
-    for msg in st.session_state.messages:
-        if msg["role"] in ("user", "assistant"):
-            chat_history_for_api.append({
-                "role": msg["role"],
-                "parts": [{"text": msg["content"]}]
-            })
+    # The backend sends the new prompt itself, so leave it out of the history.
+    # A single bounded slice, so the per-turn copy doesn't grow with the session
+    chat_history_for_api = st.session_state.api_history[-HISTORY_WINDOW_MESSAGES - 1:-1]
 
     # --- Communicate with FastAPI Backend with Enhanced Error Handling & UI Feedback ---
+    # The script ends without st.rerun(): the streamed reply is already on screen, and
+    # any error message below must stay visible
     try:
-        # Set a flag to disable input and show spinner
-        st.session_state.thinking = True
-        with st.spinner("🤖 Chatbot is thinking..."):
-            response = requests.post(
-                CHAT_ENDPOINT,
-                json={"message": prompt, "chat_history": chat_history_for_api},
-                timeout=60 # Add a timeout to prevent indefinite waiting
-            )
+        with st.session_state.http.stream(
+            "POST",
+            CHAT_ENDPOINT, # Read the Server-Sent Events as they arrive
+            json={"message": prompt, "chat_history": chat_history_for_api},
+            timeout=60 # Add a timeout to prevent indefinite waiting
+        ) as response:
+            if response.is_error:
+                response.read() # Load the error body while the stream is still open
             response.raise_for_status() # Raise an exception for HTTP errors (4xx or 5xx)
 
-            # Parse the JSON response
-            ai_response_data = response.json()
-            ai_message = ai_response_data.get("ai_message", "Sorry, I couldn't get a clear response from Gemini.")
-
-        # 3. Add AI message to chat history and display
-        st.session_state.messages.append({"role": "assistant", "content": ai_message})
-        with st.chat_message("assistant"):
-            st.markdown(
-                f"<div class='stChatMessage assistant'>🤖 &nbsp; {ai_message}</div>",
-                unsafe_allow_html=True
-            )
-
-    except requests.exceptions.ConnectionError:
+            def token_generator():
+                """Yields tokens from the backend's `data: {...}` SSE frames."""
+                for line in response.iter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    event = json.loads(line[6:])
+                    if "error" in event:
+                        raise RuntimeError(event["error"])
+                    if event.get("done"):
+                        break
+                    token = event.get("token")
+                    if token:
+                        yield token
+
+            # 3. Render tokens as they arrive; the tokens themselves replace the spinner
+            reply_placeholder = st.empty()
+            with reply_placeholder.container():
+                with st.chat_message("assistant"):
+                    ai_message = st.write_stream(token_generator())
+
+        # 4. Add AI message to chat history and swap the plain streamed text for the
+        # styled bubble, since no rerun follows to re-render it
+        assistant_message = {"role": "assistant", "content": ai_message}
+        st.session_state.messages.append(assistant_message)
+        with reply_placeholder.container():
+            render_message(assistant_message)
+        # Clipped so one very long reply can't push every later request over the backend's limit
+        st.session_state.api_history.append({"role": "model", "parts": [{"text": ai_message[:MAX_PART_LENGTH]}]})
+
+    except httpx.ConnectError:
         st.error("Connection Error: Could not connect to the backend. Please ensure the FastAPI server is running and accessible.")
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         st.error("Request Timeout: The backend took too long to respond. Please try again.")
-    except requests.exceptions.HTTPError as e:
+    except httpx.HTTPStatusError as e:
         # More detailed error handling for HTTP responses
         status_code = e.response.status_code
         error_detail = "An unknown error occurred."
@@ -149,8 +185,3 @@ if prompt:
         st.error("Invalid Response: Received an unreadable response from the backend. The server might be misconfigured.")
     except Exception as e:
         st.error(f"An unexpected error occurred: {e}")
-    finally:
-        # Always reset the thinking flag
-        st.session_state.thinking = False
-        # Re-run Streamlit to update the UI (e.g., re-enable input)
-        st.rerun() # Ensure input is re-enabled if an error occurs
\ No newline at end of file